@@ -0,0 +1,228 @@
+import time
+import tracemalloc
+
+import pandas as pd
+
+from src.utils import get_instance
+from src.solver_backend import get_backend
+from src.build_model import build_model, optimize, LAZY_LINKING_MODES
+
+
+def root_gap_callback(model, where):
+    # Keep the last incumbent and bound seen while still at the root node
+    GRB = model._backend.GRB
+    if where == GRB.Callback.MIPNODE and model.cbGet(GRB.Callback.MIPNODE_NODCNT) == 0:
+        model._root_incumbent = model.cbGet(GRB.Callback.MIPNODE_OBJBST)
+        model._root_bound = model.cbGet(GRB.Callback.MIPNODE_OBJBND)
+
+
+def compute_gap(incumbent, bound):
+    # 1e100 is GRB.INFINITY on both backends
+    if incumbent is None or abs(incumbent) >= 1e100:
+        return float("inf")
+    return abs(bound - incumbent) / max(abs(incumbent), 1e-10)
+
+
+def benchmark_valid_inequalities(
+    instance_filenames=(
+        "toy_instance.json",
+        "medium_instance.json",
+        "large_instance.json",
+    ),
+    time_limit=600,
+    backend=None,
+):
+    # HiGHS has no callbacks nor node statistics, only the final results are reported
+    with_gurobi = get_backend(backend).name == "gurobi"
+    results = []
+    for instance_filename in instance_filenames:
+        data = get_instance(instance_filename)
+        for with_valid_inequalities in [False, True]:
+            t0 = time.time()
+            model = build_model(
+                data,
+                with_epsilon_constraint=True,
+                with_valid_inequalities=with_valid_inequalities,
+                backend=backend,
+            )
+            build_time = time.time() - t0
+
+            model.Params.LogToConsole = 0
+            model.Params.TimeLimit = time_limit
+            model._root_incumbent = None
+            model._root_bound = None
+            if with_gurobi:
+                model.optimize(root_gap_callback)
+            else:
+                model.optimize()
+
+            results.append(
+                {
+                    "instance": instance_filename,
+                    "valid_inequalities": with_valid_inequalities,
+                    "status": model.Status,
+                    "objVal": model.objVal if model.SolCount > 0 else None,
+                    "root_gap": compute_gap(model._root_incumbent, model._root_bound)
+                    if with_gurobi
+                    else None,
+                    "final_gap": model.MIPGap
+                    if with_gurobi and model.SolCount > 0
+                    else None,
+                    "nodes": model.NodeCount if with_gurobi else None,
+                    "build_time": build_time,
+                    "solve_time": model.Runtime,
+                }
+            )
+            print(results[-1])
+
+    return pd.DataFrame(results)
+
+
+def cross_check_backends(
+    instance_filenames=(
+        "toy_instance.json",
+        "medium_instance.json",
+        "large_instance.json",
+    ),
+    backends=("gurobi", "highs"),
+    time_limit=600,
+    tolerance=1e-3,
+):
+    results = []
+    for instance_filename in instance_filenames:
+        data = get_instance(instance_filename)
+        for with_epsilon_constraint in [True, False]:
+            for backend in backends:
+                # A run failing, e.g. on an instance too large for a size-limited
+                # gurobi license, is recorded rather than ending the whole check
+                try:
+                    model = build_model(
+                        data,
+                        with_epsilon_constraint=with_epsilon_constraint,
+                        backend=backend,
+                    )
+                    model.Params.LogToConsole = 0
+                    model.Params.TimeLimit = time_limit
+                    # Gaps would hide small disagreements between the backends
+                    model.Params.MIPGap = 0
+                    model.optimize()
+                except Exception as error:
+                    results.append(
+                        {
+                            "instance": instance_filename,
+                            "epsilon_constraint": with_epsilon_constraint,
+                            "backend": backend,
+                            "status": f"{type(error).__name__}: {error}",
+                            "objVal": None,
+                            "max_assigned": None,
+                            "max_duration": None,
+                            "solve_time": None,
+                        }
+                    )
+                    print(results[-1])
+                    continue
+
+                solved = model.Status == model._backend.GRB.OPTIMAL
+                results.append(
+                    {
+                        "instance": instance_filename,
+                        "epsilon_constraint": with_epsilon_constraint,
+                        "backend": backend,
+                        "status": model.Status,
+                        "objVal": model.objVal if solved else None,
+                        "max_assigned": model.getVarByName("max_assigned").X
+                        if solved
+                        else None,
+                        "max_duration": model.getVarByName("max_duration").X
+                        if solved
+                        else None,
+                        "solve_time": model.Runtime,
+                    }
+                )
+                print(results[-1])
+
+    results = pd.DataFrame(results)
+    # The backends that solved a given model must agree on its optimal objectives,
+    # models solved by a single backend have nothing to compare
+    solved_groups = results[results["objVal"].notna()].groupby(
+        ["instance", "epsilon_constraint"]
+    )
+    agree = (
+        solved_groups[["objVal", "max_assigned", "max_duration"]]
+        .transform(lambda values: values.max() - values.min() <= tolerance)
+        .all(axis=1)
+    )
+    results["agree"] = agree[solved_groups["objVal"].transform("count") > 1]
+    return results
+
+
+def benchmark_lazy_linking(
+    instance_filenames=(
+        "toy_instance.json",
+        "medium_instance.json",
+        "large_instance.json",
+    ),
+    time_limit=600,
+    backend=None,
+):
+    # Lazy attributes and the solver memory usage are only available with gurobi
+    with_gurobi = get_backend(backend).name == "gurobi"
+    lazy_linking_modes = [
+        lazy_linking
+        for lazy_linking in LAZY_LINKING_MODES
+        if with_gurobi or lazy_linking != "attribute"
+    ]
+    results = []
+    for instance_filename in instance_filenames:
+        data = get_instance(instance_filename)
+        # A first unmeasured build absorbs the one-time allocations, which would
+        # otherwise be charged to the first mode
+        build_model(data, with_epsilon_constraint=True, backend=backend).update()
+        for lazy_linking in lazy_linking_modes:
+            tracemalloc.start()
+            t0 = time.time()
+            model = build_model(
+                data,
+                with_epsilon_constraint=True,
+                lazy_linking=lazy_linking,
+                backend=backend,
+            )
+            model.update()
+            build_time = time.time() - t0
+            build_python_memory = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            rows, nonzeros = model.NumConstrs, model.NumNZs
+
+            model.Params.LogToConsole = 0
+            model.Params.TimeLimit = time_limit
+            optimize(model)
+
+            results.append(
+                {
+                    "instance": instance_filename,
+                    "lazy_linking": lazy_linking,
+                    "status": model.Status,
+                    "objVal": model.objVal if model.SolCount > 0 else None,
+                    "rows": rows,
+                    "nonzeros": nonzeros,
+                    # Gurobi does not report how many "attribute" rows it pulled in
+                    "lazy_rows_added": model._lazy_rows_added
+                    if lazy_linking != "attribute"
+                    else None,
+                    "build_python_memory_mb": build_python_memory / 1e6,
+                    "solver_max_memory_mb": model.MaxMemUsed * 1e3
+                    if with_gurobi
+                    else None,
+                    "build_time": build_time,
+                    "solve_time": model.Runtime,
+                }
+            )
+            print(results[-1])
+
+    return pd.DataFrame(results)
+
+
+if __name__ == "__main__":
+    print(benchmark_valid_inequalities())
+    print(cross_check_backends())
+    print(benchmark_lazy_linking())
@@ -1,10 +1,40 @@
 import numpy as np
-import gurobipy as grb
-from gurobipy import GRB
 
+from src.solver_backend import new_model
+from src.solver_config import (
+    TUNED_PARAMETERS_FILE,
+    load_tuned_configuration,
+    apply_solver_parameters,
+)
 
-def build_model(data, with_epsilon_constraint=False):
-    model = grb.Model()
+LAZY_LINKING_MODES = [None, "attribute", "callback"]
+
+
+def build_model(
+    data,
+    with_epsilon_constraint=False,
+    with_valid_inequalities=None,
+    lazy_linking=None,
+    backend=None,
+    tuned_parameters_file=TUNED_PARAMETERS_FILE,
+):
+    model = new_model(backend)
+    GRB = model._backend.GRB
+
+    # The tuned configuration of this size class and objective only sets what leaves
+    # the optimum unchanged: the solver parameters, and the valid inequalities when
+    # left to None
+    tuned_configuration = (
+        load_tuned_configuration(
+            data, with_epsilon_constraint, model._backend.name, tuned_parameters_file
+        )
+        or {}
+    )
+    if with_valid_inequalities is None:
+        with_valid_inequalities = tuned_configuration.get(
+            "with_valid_inequalities", False
+        )
+    apply_solver_parameters(model, tuned_configuration.get("params", {}))
 
     worker_length = len(data["staff"])  # Number of workers
     job_length = len(data["jobs"])  # Number of jobs
@@ -93,8 +123,28 @@ def build_model(data, with_epsilon_constraint=False):
         max_duration,
         is_assigned_worker_job,
         max_assigned,
+        lazy_linking,
     )
 
+    if with_valid_inequalities:
+        model = add_valid_inequalities(
+            model,
+            worker_length,
+            job_length,
+            skill_length,
+            day_length,
+            work_days_job_skill,
+            qualifications_worker_skill,
+            vacations_worker_day,
+            works_worker_job_skill_day,
+            is_realized_job,
+            started_after_job_day,
+            finished_before_job_day,
+            max_duration,
+            is_assigned_worker_job,
+            max_assigned,
+        )
+
     model = add_objective(
         model,
         job_length,
@@ -128,7 +178,21 @@ def add_constraints(
     max_duration,
     is_assigned_worker_job,
     max_assigned,
+    lazy_linking=None,
 ):
+    grb = model._backend
+
+    # The three families linking each work variable to started_after, finished_before
+    # and is_assigned hold most of the rows but seldom bind. They are either added
+    # eagerly (None), flagged as lazy for gurobi ("attribute"), or left out and
+    # generated when an incumbent violates them ("callback", see optimize)
+    if lazy_linking not in LAZY_LINKING_MODES:
+        raise ValueError(
+            f"Unknown lazy_linking mode {lazy_linking}, available modes are {LAZY_LINKING_MODES}"
+        )
+    if lazy_linking == "attribute" and grb.name != "gurobi":
+        raise ValueError("Lazy constraint attributes are only supported by gurobi")
+    linking_constrs = []
 
     model.addConstrs(
         (
@@ -171,17 +235,20 @@ def add_constraints(
     )
 
     # started_after == 0 => works == 0
-    model.addConstrs(
-        (
-            works_worker_job_skill_day[worker, job, skill, day]
-            <= started_after_job_day[job, day]
-            for worker in range(worker_length)
-            for job in range(job_length)
-            for skill in range(skill_length)
-            for day in range(day_length)
-        ),
-        name="started_after",
-    )
+    if lazy_linking != "callback":
+        linking_constrs.append(
+            model.addConstrs(
+                (
+                    works_worker_job_skill_day[worker, job, skill, day]
+                    <= started_after_job_day[job, day]
+                    for worker in range(worker_length)
+                    for job in range(job_length)
+                    for skill in range(skill_length)
+                    for day in range(day_length)
+                ),
+                name="started_after",
+            )
+        )
     # increasing sequence
     model.addConstrs(
         (
@@ -202,17 +269,20 @@ def add_constraints(
     )
 
     # finished before == 1 => works == 0
-    model.addConstrs(
-        (
-            works_worker_job_skill_day[worker, job, skill, day]
-            <= 1 - finished_before_job_day[job, day]
-            for worker in range(worker_length)
-            for job in range(job_length)
-            for skill in range(skill_length)
-            for day in range(day_length)
-        ),
-        name="finished_before",
-    )
+    if lazy_linking != "callback":
+        linking_constrs.append(
+            model.addConstrs(
+                (
+                    works_worker_job_skill_day[worker, job, skill, day]
+                    <= 1 - finished_before_job_day[job, day]
+                    for worker in range(worker_length)
+                    for job in range(job_length)
+                    for skill in range(skill_length)
+                    for day in range(day_length)
+                ),
+                name="finished_before",
+            )
+        )
     # increasing sequence
     model.addConstrs(
         (
@@ -245,17 +315,20 @@ def add_constraints(
     )
 
     # exists_skill_day works == 1 => is_assigned == 1
-    model.addConstrs(
-        (
-            works_worker_job_skill_day[worker, job, skill, day]
-            <= is_assigned_worker_job[worker, job]
-            for worker in range(worker_length)
-            for job in range(job_length)
-            for skill in range(skill_length)
-            for day in range(day_length)
-        ),
-        name="is_assigned_worker_job",
-    )
+    if lazy_linking != "callback":
+        linking_constrs.append(
+            model.addConstrs(
+                (
+                    works_worker_job_skill_day[worker, job, skill, day]
+                    <= is_assigned_worker_job[worker, job]
+                    for worker in range(worker_length)
+                    for job in range(job_length)
+                    for skill in range(skill_length)
+                    for day in range(day_length)
+                ),
+                name="is_assigned_worker_job",
+            )
+        )
     # forall_skill_day works == 0 => is_assigned == 0
     model.addConstrs(
         (
@@ -282,6 +355,228 @@ def add_constraints(
         name="max_assigned",
     )
 
+    if lazy_linking == "attribute":
+        for constrs in linking_constrs:
+            model.setAttr("Lazy", list(constrs.values()), [1] * len(constrs))
+
+    model._lazy_linking = None
+    model._lazy_rows_added = 0
+    if lazy_linking == "callback":
+        if grb.name == "gurobi":
+            model.Params.LazyConstraints = 1
+        model._lazy_linking = {
+            "shape": (worker_length, job_length, skill_length, day_length),
+            "works": list(works_worker_job_skill_day.values()),
+            "started_after": list(started_after_job_day.values()),
+            "finished_before": list(finished_before_job_day.values()),
+            "is_assigned": list(is_assigned_worker_job.values()),
+        }
+
+    return model
+
+
+def find_violated_linking(model, get_values):
+    # Returns the linking rows left out of the model that are violated by the values
+    # of the current solution. get_values maps a list of variables to their values
+    lazy = model._lazy_linking
+    worker_length, job_length, skill_length, day_length = lazy["shape"]
+    works = np.reshape(get_values(lazy["works"]), lazy["shape"]) > 0.5
+    started_after = np.reshape(
+        get_values(lazy["started_after"]), (job_length, day_length)
+    )
+    finished_before = np.reshape(
+        get_values(lazy["finished_before"]), (job_length, day_length)
+    )
+    is_assigned = np.reshape(
+        get_values(lazy["is_assigned"]), (worker_length, job_length)
+    )
+
+    violated = []
+    # Only a worker actually working can violate one of these rows
+    for worker, job, skill, day in np.argwhere(works):
+        work = lazy["works"][
+            ((worker * job_length + job) * skill_length + skill) * day_length + day
+        ]
+        if started_after[job, day] < 0.5:
+            violated.append(
+                work <= lazy["started_after"][job * day_length + day]
+            )
+        if finished_before[job, day] > 0.5:
+            violated.append(
+                work <= 1 - lazy["finished_before"][job * day_length + day]
+            )
+        if is_assigned[worker, job] < 0.5:
+            violated.append(
+                work <= lazy["is_assigned"][worker * job_length + job]
+            )
+    return violated
+
+
+def lazy_linking_callback(model, where):
+    if where == model._backend.GRB.Callback.MIPSOL:
+        for constr in find_violated_linking(model, model.cbGetSolution):
+            model.cbLazy(constr)
+            model._lazy_rows_added += 1
+
+
+def optimize(model):
+    # Solves a model from build_model, generating the lazy linking rows if needed
+    if getattr(model, "_lazy_linking", None) is None:
+        model.optimize()
+    elif model._backend.name == "gurobi":
+        model.optimize(lazy_linking_callback)
+    else:
+        # Without callbacks, the violated rows are added between successive solves
+        GRB = model._backend.GRB
+        while True:
+            model.optimize()
+            if model.Status != GRB.OPTIMAL:
+                break
+            violated = find_violated_linking(
+                model, lambda variables: [var.X for var in variables]
+            )
+            if len(violated) == 0:
+                break
+            for constr in violated:
+                model.addConstr(constr)
+            model._lazy_rows_added += len(violated)
+
+
+def add_valid_inequalities(
+    model,
+    worker_length,
+    job_length,
+    skill_length,
+    day_length,
+    work_days_job_skill,
+    qualifications_worker_skill,
+    vacations_worker_day,
+    works_worker_job_skill_day,
+    is_realized_job,
+    started_after_job_day,
+    finished_before_job_day,
+    max_duration,
+    is_assigned_worker_job,
+    max_assigned,
+):
+    grb = model._backend
+    # Cuts implied by the integer model but not by its LP relaxation
+
+    # No job can last more than the horizon, no worker can do more than every job
+    max_duration.UB = day_length
+    max_assigned.UB = job_length
+
+    qualified_workers_skill = qualifications_worker_skill.sum(axis=0)
+    required_skills_job = work_days_job_skill > 0
+    # 1 if a worker holds at least one skill required by a job, else 0
+    useful_worker_job = (
+        qualifications_worker_skill @ required_skills_job.T.astype(int) > 0
+    ).astype(int)
+    available_worker_day = 1 - vacations_worker_day
+
+    # A job needing a skill that nobody has can never be realized
+    model.addConstrs(
+        (
+            is_realized_job[job] == 0
+            for job in range(job_length)
+            if np.any(required_skills_job[job] & (qualified_workers_skill == 0))
+        ),
+        name="unrealizable_job",
+    )
+
+    # Each worker does at most one skill-day per day, so a realized job lasts at
+    # least as many days as its busiest skill or its whole workload requires
+    duration_lower_bound_job = np.zeros(job_length, dtype=int)
+    for job in range(job_length):
+        if not np.any(required_skills_job[job]) or useful_worker_job[:, job].sum() == 0:
+            continue
+        skill_bound = max(
+            -(-work_days_job_skill[job, skill] // qualified_workers_skill[skill])
+            for skill in range(skill_length)
+            if required_skills_job[job, skill] and qualified_workers_skill[skill] > 0
+        )
+        workload_bound = -(
+            -work_days_job_skill[job].sum() // useful_worker_job[:, job].sum()
+        )
+        duration_lower_bound_job[job] = min(
+            max(skill_bound, workload_bound), day_length
+        )
+
+    model.addConstrs(
+        (
+            grb.quicksum(
+                started_after_job_day[job, day] - finished_before_job_day[job, day]
+                for day in range(day_length)
+            )
+            >= duration_lower_bound_job[job] * is_realized_job[job]
+            for job in range(job_length)
+            if duration_lower_bound_job[job] > 0
+        ),
+        name="duration_lower_bound",
+    )
+    model.addConstrs(
+        (
+            max_duration >= duration_lower_bound_job[job] * is_realized_job[job]
+            for job in range(job_length)
+            if duration_lower_bound_job[job] > 0
+        ),
+        name="max_duration_lower_bound",
+    )
+    # A job with work to do is started before it is finished
+    model.addConstrs(
+        (
+            finished_before_job_day[job, day] <= started_after_job_day[job, day]
+            for job in range(job_length)
+            if np.any(required_skills_job[job])
+            for day in range(day_length)
+        ),
+        name="finished_before_started_after",
+    )
+
+    # A realized job needs enough qualified workers to cover each skill within the horizon
+    model.addConstrs(
+        (
+            grb.quicksum(
+                is_assigned_worker_job[worker, job]
+                for worker in range(worker_length)
+                if qualifications_worker_skill[worker, skill] == 1
+            )
+            >= -(-work_days_job_skill[job, skill] // day_length) * is_realized_job[job]
+            for job in range(job_length)
+            for skill in range(skill_length)
+            if required_skills_job[job, skill] and qualified_workers_skill[skill] > 0
+        ),
+        name="skill_coverage_assigned",
+    )
+    # Every realized job has at least one assigned worker, so the realized jobs
+    # are spread over at most worker_length * max_assigned assignments
+    model.addConstr(
+        worker_length * max_assigned
+        >= grb.quicksum(
+            is_realized_job[job]
+            for job in range(job_length)
+            if np.any(required_skills_job[job])
+        ),
+        name="max_assigned_lower_bound",
+    )
+
+    # On a given day, a job gets at most one skill-day per available useful worker,
+    # and none at all outside of its [started_after, finished_before) window
+    model.addConstrs(
+        (
+            grb.quicksum(
+                works_worker_job_skill_day[worker, job, skill, day]
+                for worker in range(worker_length)
+                for skill in range(skill_length)
+            )
+            <= (useful_worker_job[:, job] * available_worker_day[:, day]).sum()
+            * (started_after_job_day[job, day] - finished_before_job_day[job, day])
+            for job in range(job_length)
+            for day in range(day_length)
+        ),
+        name="day_capacity",
+    )
+
     return model
 
 
@@ -298,9 +593,10 @@ def add_objective(
     max_assigned,
     with_epsilon_constraint,
 ):
+    grb = model._backend
     if not with_epsilon_constraint:
         # Add primary objective
-        model.ModelSense = GRB.MAXIMIZE
+        model.ModelSense = grb.GRB.MAXIMIZE
         model.setObjectiveN(
             grb.quicksum(
                 gains_job[job] * is_realized_job[job]
@@ -339,7 +635,27 @@ def add_objective(
             )
             - 0.005 * max_assigned
             - 0.001 * max_duration,
-            sense=GRB.MAXIMIZE,
+            sense=grb.GRB.MAXIMIZE,
         )
 
     return model
+
+
+def evaluate_objective(data, variables):
+    # Value of the weighted-sum objective (with_epsilon_constraint=True) for a
+    # solution given as a dictionary of variable values, whatever model produced it
+    day_length = data["horizon"]
+    primary_objective = sum(
+        job["gain"] * variables[f"is_realized[{index}]"]
+        - job["daily_penalty"]
+        * sum(
+            1 - variables[f"finished_before[{index},{day}]"]
+            for day in range(job["due_date"], day_length)
+        )
+        for index, job in enumerate(data["jobs"])
+    )
+    return (
+        primary_objective
+        - 0.005 * variables["max_assigned"]
+        - 0.001 * variables["max_duration"]
+    )
@@ -1,12 +1,13 @@
 from random import random, sample
 
 import pandas as pd
-import gurobipy as grb
-from gurobipy import GRB
 
+from src.solver_backend import new_model
 
-def find_pref_model(unacceptable, correct, satisfactory):
-    model = grb.Model()
+
+def find_pref_model(unacceptable, correct, satisfactory, backend=None):
+    model = new_model(backend)
+    GRB = model._backend.GRB
 
     # Define decision variables
     omega_1 = model.addVar(0.0, 1.0, vtype=GRB.CONTINUOUS, name="omega_1")
@@ -183,8 +184,10 @@ def order_solutions(instance, models, params):
     return res
 
 
-def preferences(instance, solutions, unacceptable, correct, satisfactory):
-    params = find_pref_model(unacceptable, correct, satisfactory)
+def preferences(
+    instance, solutions, unacceptable, correct, satisfactory, backend=None
+):
+    params = find_pref_model(unacceptable, correct, satisfactory, backend)
     print(f"Weights:\t({params[0]:.2f}, {params[1]:.2f}, {params[2]:.2f})")
     print(f"Thresholds:\t({params[3]:.2f}, {params[4]:.2f})")
     return order_solutions(instance, solutions, params)
@@ -1,7 +1,13 @@
 import os
 import pickle
 
-from gurobipy import GRB
+from src.build_model import optimize
+from src.pareto_archive import ParetoArchive
+from src.solver_config import (
+    TUNED_PARAMETERS_FILE,
+    load_tuned_configuration,
+    apply_solver_parameters,
+)
 
 
 def compute_non_dominated_surface(
@@ -9,14 +15,24 @@ def compute_non_dominated_surface(
     data,
     max_assigned_name: str = "max_assigned",
     max_duration_name: str = "max_duration",
+    tuned_parameters_file=TUNED_PARAMETERS_FILE,
+    progress_callback=None,
 ):
+    GRB = model._backend.GRB
+    tuned_configuration = (
+        load_tuned_configuration(
+            data, True, model._backend.name, tuned_parameters_file
+        )
+        or {}
+    )
+    apply_solver_parameters(model, tuned_configuration.get("params", {}))
     model.Params.LogToConsole = 0  # muting the output of model.optimize()
 
-    model.optimize()  # required to optimize to retrieve the variables in getVars
+    optimize(model)  # required to optimize to retrieve the variables in getVars
     max_duration = model.getVarByName(max_duration_name)
     max_assigned = model.getVarByName(max_assigned_name)
 
-    non_dominated_solutions = []
+    non_dominated_solutions = ParetoArchive()
 
     horizon = data["horizon"]  # max value max duration can take
     total_nb_projects = len(data["jobs"])  # max value max assigned can take
@@ -43,13 +59,13 @@ def compute_non_dominated_surface(
                 name=f"{max_assigned_name}_epsilon",
             )
 
-            model.optimize()
+            optimize(model)
 
             model.remove(model.getConstrByName(f"{max_assigned_name}_epsilon"))
 
             if model.Status == GRB.OPTIMAL:
                 solutions_variable = build_variables_dictionnary(model)
-                non_dominated_solutions.append(solutions_variable)
+                non_dominated_solutions.add(solutions_variable)
 
                 next_epsilon_c_max_duration = max(
                     solutions_variable[max_duration_name], next_epsilon_c_max_duration
@@ -58,6 +74,16 @@ def compute_non_dominated_surface(
                 print(
                     f"Objective: {solutions_variable['objVal']}, max_duration: {solutions_variable[max_duration_name]}, max_assigned: {solutions_variable[max_assigned_name]}\n"
                 )
+                if progress_callback is not None:
+                    progress_callback(
+                        {
+                            "epsilon_max_duration": epsilon_c_max_duration,
+                            "objVal": solutions_variable["objVal"],
+                            "max_duration": solutions_variable[max_duration_name],
+                            "max_assigned": solutions_variable[max_assigned_name],
+                            "nb_solutions": len(non_dominated_solutions),
+                        }
+                    )
 
             elif model.Status == GRB.INFEASIBLE:
                 break
@@ -0,0 +1,200 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from src.build_model import build_model, optimize
+from src.compute_surface import build_variables_dictionnary
+
+
+def find_components(data):
+    # Connected components of the bipartite graph linking workers to the jobs that
+    # need at least one of their skills, as lists of worker and job indices
+    qualifications_worker_skill = np.array(
+        [
+            [
+                1 if skill in worker["qualifications"] else 0
+                for skill in data["qualifications"]
+            ]
+            for worker in data["staff"]
+        ]
+    )
+    work_days_job_skill = np.array(
+        [
+            [
+                job["working_days_per_qualification"][skill]
+                if skill in job["working_days_per_qualification"]
+                else 0
+                for skill in data["qualifications"]
+            ]
+            for job in data["jobs"]
+        ]
+    )
+    worker_length, job_length = len(data["staff"]), len(data["jobs"])
+    if worker_length == 0 or job_length == 0:
+        return []
+    linked_worker_job = qualifications_worker_skill @ (work_days_job_skill > 0).T > 0
+
+    # Union-find over workers (0..W-1) and jobs (W..W+J-1)
+    parent = list(range(worker_length + job_length))
+
+    def find(node):
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    for worker, job in np.argwhere(linked_worker_job):
+        parent[find(worker)] = find(worker_length + job)
+
+    components = {}
+    for worker in range(worker_length):
+        components.setdefault(find(worker), ([], []))[0].append(worker)
+    for job in range(job_length):
+        components.setdefault(find(worker_length + job), ([], []))[1].append(job)
+
+    # Lone workers have nothing to do and lone jobs need no worker or can not be realized
+    return [
+        (workers, jobs) for (workers, jobs) in components.values() if workers and jobs
+    ]
+
+
+def build_sub_instance(data, workers, jobs):
+    return {
+        "horizon": data["horizon"],
+        "qualifications": data["qualifications"],
+        "staff": [data["staff"][worker] for worker in workers],
+        "jobs": [data["jobs"][job] for job in jobs],
+    }
+
+
+def solve_component(
+    sub_data, epsilon_max_assigned, epsilon_max_duration, threads, model_options
+):
+    model = build_model(sub_data, with_epsilon_constraint=True, **model_options)
+    model.Params.LogToConsole = 0
+    if threads is not None:
+        model.Params.Threads = threads
+    model.update()  # variable names are only available after an update
+    model.addConstr(
+        model.getVarByName("max_assigned") <= epsilon_max_assigned,
+        name="max_assigned_epsilon",
+    )
+    model.addConstr(
+        model.getVarByName("max_duration") <= epsilon_max_duration,
+        name="max_duration_epsilon",
+    )
+    optimize(model)
+    if model.Status != model._backend.GRB.OPTIMAL:
+        return model.Status, None
+    return model.Status, build_variables_dictionnary(model)
+
+
+def solve_decomposed(
+    data,
+    epsilon_max_assigned=None,
+    epsilon_max_duration=None,
+    max_workers=None,
+    threads=None,
+    **model_options,
+):
+    # Under fixed epsilon bounds, the planning problem splits into one independent
+    # sub-model per component, solved in parallel. The primary objective is exact,
+    # while the max_assigned / max_duration tie-break is settled per component.
+    # Returns the solution dictionary of the whole instance, or None if a
+    # component is infeasible
+    if epsilon_max_assigned is None:
+        epsilon_max_assigned = len(data["jobs"])
+    if epsilon_max_duration is None:
+        epsilon_max_duration = data["horizon"]
+
+    worker_length = len(data["staff"])
+    job_length = len(data["jobs"])
+    skill_length = len(data["qualifications"])
+    day_length = data["horizon"]
+
+    components = find_components(data)
+    # The cores are shared between the processes rather than oversubscribed
+    if max_workers is None:
+        max_workers = max(1, min(len(components), os.cpu_count()))
+    if threads is None:
+        threads = max(1, os.cpu_count() // max_workers)
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(
+                solve_component,
+                build_sub_instance(data, workers, jobs),
+                epsilon_max_assigned,
+                epsilon_max_duration,
+                threads,
+                model_options,
+            )
+            for (workers, jobs) in components
+        ]
+        sub_solutions = [future.result()[1] for future in futures]
+
+    if any(sub_solution is None for sub_solution in sub_solutions):
+        return None
+
+    # Workers and jobs outside of every component stay idle and unrealized
+    variables = {}
+    for worker in range(worker_length):
+        for job in range(job_length):
+            for skill in range(skill_length):
+                for day in range(day_length):
+                    variables[f"work[{worker},{job},{skill},{day}]"] = 0
+    for job in range(job_length):
+        variables[f"is_realized[{job}]"] = 0
+    for job in range(job_length):
+        for day in range(day_length):
+            variables[f"started_after[{job},{day}]"] = 1
+    for job in range(job_length):
+        for day in range(day_length):
+            variables[f"finished_before[{job},{day}]"] = 1
+    variables["max_duration"] = 0
+    for worker in range(worker_length):
+        for job in range(job_length):
+            variables[f"is_assigned[{worker},{job}]"] = 0
+    variables["max_assigned"] = 0
+
+    max_duration, max_assigned, primary_objective = 0, 0, 0
+    # Jobs without any work to do belong to no component but are realized for free
+    for job in range(job_length):
+        if sum(data["jobs"][job]["working_days_per_qualification"].values()) == 0:
+            variables[f"is_realized[{job}]"] = 1
+            primary_objective += data["jobs"][job]["gain"]
+
+    for (workers, jobs), sub_solution in zip(components, sub_solutions):
+        for sub_worker, worker in enumerate(workers):
+            for sub_job, job in enumerate(jobs):
+                for skill in range(skill_length):
+                    for day in range(day_length):
+                        variables[f"work[{worker},{job},{skill},{day}]"] = sub_solution[
+                            f"work[{sub_worker},{sub_job},{skill},{day}]"
+                        ]
+                variables[f"is_assigned[{worker},{job}]"] = sub_solution[
+                    f"is_assigned[{sub_worker},{sub_job}]"
+                ]
+        for sub_job, job in enumerate(jobs):
+            variables[f"is_realized[{job}]"] = sub_solution[f"is_realized[{sub_job}]"]
+            for day in range(day_length):
+                variables[f"started_after[{job},{day}]"] = sub_solution[
+                    f"started_after[{sub_job},{day}]"
+                ]
+                variables[f"finished_before[{job},{day}]"] = sub_solution[
+                    f"finished_before[{sub_job},{day}]"
+                ]
+
+        max_duration = max(max_duration, sub_solution["max_duration"])
+        max_assigned = max(max_assigned, sub_solution["max_assigned"])
+        # Remove the sub-model tie-breaking terms to recover its primary objective
+        primary_objective += (
+            sub_solution["objVal"]
+            + 0.005 * sub_solution["max_assigned"]
+            + 0.001 * sub_solution["max_duration"]
+        )
+
+    variables["max_duration"] = max_duration
+    variables["max_assigned"] = max_assigned
+    variables["objVal"] = primary_objective - 0.005 * max_assigned - 0.001 * max_duration
+    return variables
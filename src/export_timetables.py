@@ -0,0 +1,213 @@
+import os
+import csv
+import html
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+import numpy as np
+import matplotlib as mpl
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+from src.utils import get_instance, get_job_colors
+from src.compute_surface import load_non_dominated_surface
+
+FORMATS = ["html", "csv", "png"]
+
+# Layout of the instance being exported, set once in each worker process
+_layout = None
+
+
+def build_layout(instance):
+    # Everything that only depends on the instance, computed once for the whole front
+    worker_length = len(instance["staff"])
+    job_length = len(instance["jobs"])
+    skill_length = len(instance["qualifications"])
+    day_length = instance["horizon"]
+    job_colors = get_job_colors(job_length)
+    return {
+        "shape": (worker_length, job_length, skill_length, day_length),
+        "work_keys": [
+            f"work[{worker},{job},{skill},{day}]"
+            for worker in range(worker_length)
+            for job in range(job_length)
+            for skill in range(skill_length)
+            for day in range(day_length)
+        ],
+        "names": [worker["name"] for worker in instance["staff"]],
+        "jobs": [job["name"] for job in instance["jobs"]],
+        "qualifications": instance["qualifications"],
+        "job_styles": [
+            f"color:black;background-color: {color}" for color in job_colors
+        ],
+        # Last row is the white background of idle days
+        "job_rgb": np.array(
+            [mpl.colors.to_rgb(color) for color in job_colors] + [(1.0, 1.0, 1.0)]
+        ),
+    }
+
+
+def build_time_table(layout, solution):
+    # Worker x day grids of the job index and skill index worked on, -1 when idle
+    works = np.fromiter(
+        (solution[key] for key in layout["work_keys"]),
+        dtype=np.int8,
+        count=len(layout["work_keys"]),
+    ).reshape(layout["shape"])
+    worker_length, _, _, day_length = layout["shape"]
+    job_grid = np.full((worker_length, day_length), -1)
+    skill_grid = np.full((worker_length, day_length), -1)
+    worker, job, skill, day = np.nonzero(works)
+    job_grid[worker, day] = job
+    skill_grid[worker, day] = skill
+    return job_grid, skill_grid
+
+
+def write_csv(layout, job_grid, skill_grid, filepath):
+    with open(filepath, "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(["worker"] + list(range(job_grid.shape[1])))
+        for name, jobs, skills in zip(layout["names"], job_grid, skill_grid):
+            writer.writerow(
+                [name]
+                + [
+                    f"{layout['jobs'][job]}:{layout['qualifications'][skill]}"
+                    if job != -1
+                    else ""
+                    for job, skill in zip(jobs, skills)
+                ]
+            )
+
+
+def write_html(layout, job_grid, skill_grid, filepath, title=""):
+    # Rows are written one by one rather than rendered as a whole
+    with open(filepath, "w") as file:
+        file.write(f"<html><head><title>{html.escape(title)}</title></head><body>\n")
+        file.write(f"<h3>{html.escape(title)}</h3>\n<table border='1'>\n<tr><th></th>")
+        file.write("".join(f"<th>{day}</th>" for day in range(job_grid.shape[1])))
+        file.write("</tr>\n")
+        for name, jobs, skills in zip(layout["names"], job_grid, skill_grid):
+            file.write(f"<tr><th>{html.escape(name)}</th>")
+            file.write(
+                "".join(
+                    f"<td style='{layout['job_styles'][job]}' title='{html.escape(layout['jobs'][job])}'>"
+                    f"{html.escape(layout['qualifications'][skill])}</td>"
+                    if job != -1
+                    else "<td></td>"
+                    for job, skill in zip(jobs, skills)
+                )
+            )
+            file.write("</tr>\n")
+        file.write("</table>\n</body></html>\n")
+
+
+def write_png(layout, job_grid, skill_grid, filepath, title=""):
+    worker_length, day_length = job_grid.shape
+    figure = Figure(figsize=(max(4, 0.4 * day_length), max(2, 0.4 * worker_length)))
+    FigureCanvasAgg(figure)
+    axes = figure.add_subplot()
+    # Index -1 of idle days picks the white background row
+    axes.imshow(layout["job_rgb"][job_grid], aspect="auto")
+    for worker, day in zip(*np.nonzero(job_grid != -1)):
+        axes.text(
+            day,
+            worker,
+            layout["qualifications"][skill_grid[worker, day]],
+            ha="center",
+            va="center",
+            fontsize=8,
+        )
+    axes.set_xticks(range(day_length))
+    axes.set_yticks(range(worker_length), layout["names"])
+    axes.set_title(title)
+    figure.savefig(filepath, bbox_inches="tight")
+
+
+def init_worker(layout):
+    global _layout
+    _layout = layout
+
+
+def export_solution(index, solution, output_folder, formats):
+    job_grid, skill_grid = build_time_table(_layout, solution)
+    title = (
+        f"Objective: {solution['objVal']:.3f}, max assigned: {solution['max_assigned']}"
+        f", max duration: {solution['max_duration']}"
+    )
+    basename = os.path.join(
+        output_folder,
+        f"solution_{index:04d}_assigned_{solution['max_assigned']}"
+        f"_duration_{solution['max_duration']}",
+    )
+    writers = {"html": write_html, "csv": write_csv, "png": write_png}
+    filepaths = []
+    for file_format in formats:
+        filepath = f"{basename}.{file_format}"
+        if file_format == "csv":
+            writers[file_format](_layout, job_grid, skill_grid, filepath)
+        else:
+            writers[file_format](_layout, job_grid, skill_grid, filepath, title)
+        filepaths.append(filepath)
+    return (
+        index,
+        solution["objVal"],
+        solution["max_assigned"],
+        solution["max_duration"],
+        filepaths,
+    )
+
+
+def export_time_tables(
+    instance, solutions, output_folder, formats=FORMATS, max_workers=None
+):
+    # Renders the timetable of every solution of a front in parallel. At most a few
+    # solutions per process are in flight at once and every result is written as
+    # soon as it is ready, so memory stays flat whatever the size of the front.
+    # An index.csv lists the files written for each solution
+    for file_format in formats:
+        if file_format not in FORMATS:
+            raise ValueError(f"Unknown format {file_format}, available formats are {FORMATS}")
+    os.makedirs(output_folder, exist_ok=True)
+    max_workers = max_workers or os.cpu_count()
+    max_pending = 2 * max_workers
+
+    with open(os.path.join(output_folder, "index.csv"), "w", newline="") as file, (
+        ProcessPoolExecutor(
+            max_workers=max_workers,
+            initializer=init_worker,
+            initargs=(build_layout(instance),),
+        )
+    ) as executor:
+        writer = csv.writer(file)
+        writer.writerow(["index", "objVal", "max_assigned", "max_duration", "files"])
+
+        pending = set()
+        for index, solution in enumerate(solutions):
+            if len(pending) >= max_pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    *row, filepaths = future.result()
+                    writer.writerow(row + [";".join(filepaths)])
+            pending.add(
+                executor.submit(
+                    export_solution, index, solution, output_folder, formats
+                )
+            )
+        for future in wait(pending).done:
+            *row, filepaths = future.result()
+            writer.writerow(row + [";".join(filepaths)])
+
+
+def export_saved_surface(
+    instance_filename,
+    surface_filename,
+    output_folder=None,
+    formats=FORMATS,
+    folder="results",
+    max_workers=None,
+):
+    instance = get_instance(instance_filename)
+    solutions = load_non_dominated_surface(surface_filename, folder)
+    if output_folder is None:
+        output_folder = os.path.join(folder, os.path.splitext(surface_filename)[0])
+    export_time_tables(instance, solutions, output_folder, formats, max_workers)
+    return output_folder
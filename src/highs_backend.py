@@ -0,0 +1,402 @@
+import time
+
+import numpy as np
+from scipy.optimize import milp, Bounds, LinearConstraint
+from scipy.sparse import coo_array
+
+# Mirrors the subset of the gurobipy API used in this project, so that models can
+# be built and solved with HiGHS (through scipy) without a Gurobi license.
+
+
+class GRB:
+    BINARY = "B"
+    INTEGER = "I"
+    CONTINUOUS = "C"
+
+    MINIMIZE = 1
+    MAXIMIZE = -1
+
+    LESS_EQUAL = "<"
+    GREATER_EQUAL = ">"
+    EQUAL = "="
+
+    # Same status codes as gurobipy
+    LOADED = 1
+    OPTIMAL = 2
+    INFEASIBLE = 3
+    UNBOUNDED = 5
+    ITERATION_LIMIT = 7
+    TIME_LIMIT = 9
+    NUMERIC = 12
+
+    INFINITY = 1e100
+
+
+class LinExpr:
+    __array_ufunc__ = None  # numpy scalars defer to our reflected operators
+
+    def __init__(self, indices=None, coefs=None, constant=0.0):
+        self.indices = [] if indices is None else indices
+        self.coefs = [] if coefs is None else coefs
+        self.constant = constant
+
+    def copy(self):
+        return LinExpr(list(self.indices), list(self.coefs), self.constant)
+
+    def add(self, other, multiplier=1.0):
+        if isinstance(other, Var):
+            self.indices.append(other.index)
+            self.coefs.append(multiplier)
+        elif isinstance(other, LinExpr):
+            self.indices.extend(other.indices)
+            if multiplier == 1.0:
+                self.coefs.extend(other.coefs)
+            else:
+                self.coefs.extend(multiplier * coef for coef in other.coefs)
+            self.constant += multiplier * other.constant
+        else:
+            self.constant += multiplier * float(other)
+        return self
+
+    def getValue(self, x):
+        return float(np.dot(self.coefs, x[self.indices])) + self.constant
+
+    def __iadd__(self, other):
+        return self.add(other)
+
+    def __isub__(self, other):
+        return self.add(other, -1.0)
+
+    def __add__(self, other):
+        return self.copy().add(other)
+
+    def __radd__(self, other):
+        return self.copy().add(other)
+
+    def __sub__(self, other):
+        return self.copy().add(other, -1.0)
+
+    def __rsub__(self, other):
+        return LinExpr().add(self, -1.0).add(other)
+
+    def __neg__(self):
+        return LinExpr().add(self, -1.0)
+
+    def __mul__(self, other):
+        if isinstance(other, (Var, LinExpr)):
+            raise TypeError("Only linear expressions are supported")
+        return LinExpr().add(self, float(other))
+
+    __rmul__ = __mul__
+
+    def __le__(self, other):
+        return TempConstr(self - other, GRB.LESS_EQUAL)
+
+    def __ge__(self, other):
+        return TempConstr(self - other, GRB.GREATER_EQUAL)
+
+    def __eq__(self, other):
+        return TempConstr(self - other, GRB.EQUAL)
+
+    __hash__ = object.__hash__
+
+
+class Var(LinExpr):
+    def __init__(self, model, index, name):
+        self.model = model
+        self.index = index
+        self.VarName = name
+
+    # A variable behaves as the expression 1 * var
+    @property
+    def indices(self):
+        return [self.index]
+
+    @property
+    def coefs(self):
+        return [1.0]
+
+    @property
+    def constant(self):
+        return 0.0
+
+    def copy(self):
+        return LinExpr([self.index], [1.0], 0.0)
+
+    @property
+    def LB(self):
+        return self.model._lb[self.index]
+
+    @LB.setter
+    def LB(self, value):
+        self.model._lb[self.index] = value
+
+    @property
+    def UB(self):
+        return self.model._ub[self.index]
+
+    @UB.setter
+    def UB(self, value):
+        self.model._ub[self.index] = value
+
+    @property
+    def X(self):
+        if self.model._x is None:
+            raise AttributeError("Unable to retrieve attribute 'X'")
+        return self.model._x[self.index]
+
+    x = X
+
+    def __repr__(self):
+        return f"<highs.Var {self.VarName}>"
+
+
+class TempConstr:
+    def __init__(self, expr, sense):
+        self.expr = expr
+        self.sense = sense
+
+
+class Constr:
+    def __init__(self, expr, sense, name):
+        self.expr = expr
+        self.sense = sense
+        self.ConstrName = name
+
+
+class Params:
+    def __init__(self):
+        self.LogToConsole = 1
+        self.OutputFlag = 1
+        self.TimeLimit = GRB.INFINITY
+        self.MIPGap = 1e-4
+        # Accepted for compatibility, scipy does not expose them
+        self.Threads = 0
+        self.Seed = 0
+
+
+def quicksum(terms):
+    expr = LinExpr()
+    for term in terms:
+        expr.add(term)
+    return expr
+
+
+class Model:
+    def __init__(self, name=""):
+        self.ModelName = name
+        self.Params = Params()
+        self.ModelSense = GRB.MINIMIZE
+        self.Status = GRB.LOADED
+        self.Runtime = 0.0
+        self._vars = []
+        self._var_by_name = {}
+        self._lb = []
+        self._ub = []
+        self._vtype = []
+        self._constrs = {}
+        self._constr_by_name = {}
+        self._objective = LinExpr()
+        self._objectives_n = {}
+        self._x = None
+        self._objVal = None
+
+    ## VARIABLES ##
+
+    def addVar(self, lb=0.0, ub=GRB.INFINITY, obj=0.0, vtype=GRB.CONTINUOUS, name=""):
+        index = len(self._vars)
+        var = Var(self, index, name or f"C{index}")
+        if vtype == GRB.BINARY:
+            ub = min(ub, 1.0)
+        self._vars.append(var)
+        self._var_by_name[var.VarName] = var
+        self._lb.append(lb)
+        self._ub.append(ub)
+        self._vtype.append(vtype)
+        if obj != 0.0:
+            self._objective.add(var, obj)
+        return var
+
+    def addVars(self, *dimensions, lb=0.0, ub=GRB.INFINITY, vtype=GRB.CONTINUOUS, name=""):
+        variables = {}
+        for key in np.ndindex(*dimensions):
+            key = key[0] if len(key) == 1 else key
+            label = ",".join(map(str, key)) if isinstance(key, tuple) else str(key)
+            variables[key] = self.addVar(lb, ub, vtype=vtype, name=f"{name}[{label}]")
+        return variables
+
+    def getVars(self):
+        return list(self._vars)
+
+    def getVarByName(self, name):
+        return self._var_by_name.get(name)
+
+    ## CONSTRAINTS ##
+
+    def addConstr(self, constr, name=""):
+        if not isinstance(constr, TempConstr):
+            raise TypeError("Expected a linear constraint such as 'expr <= rhs'")
+        new_constr = Constr(constr.expr, constr.sense, name)
+        self._constrs[id(new_constr)] = new_constr
+        if name:
+            self._constr_by_name[name] = new_constr
+        return new_constr
+
+    def addConstrs(self, constrs, name=""):
+        return {
+            index: self.addConstr(constr, name=f"{name}[{index}]" if name else "")
+            for index, constr in enumerate(constrs)
+        }
+
+    def getConstrByName(self, name):
+        return self._constr_by_name.get(name)
+
+    def getConstrs(self):
+        return list(self._constrs.values())
+
+    def remove(self, constr):
+        self._constrs.pop(id(constr), None)
+        if self._constr_by_name.get(constr.ConstrName) is constr:
+            del self._constr_by_name[constr.ConstrName]
+
+    def update(self):
+        pass
+
+    @property
+    def NumVars(self):
+        return len(self._vars)
+
+    @property
+    def NumConstrs(self):
+        return len(self._constrs)
+
+    @property
+    def NumNZs(self):
+        return sum(len(constr.expr.indices) for constr in self._constrs.values())
+
+    ## OBJECTIVE ##
+
+    def setObjective(self, expr, sense=None):
+        self._objective = LinExpr().add(expr)
+        self._objectives_n = {}
+        if sense is not None:
+            self.ModelSense = sense
+
+    def setObjectiveN(self, expr, index, priority=0, weight=1.0, name=""):
+        self._objectives_n[index] = (priority, weight, LinExpr().add(expr))
+
+    ## SOLVE ##
+
+    def optimize(self, callback=None):
+        if callback is not None:
+            raise NotImplementedError("Callbacks are only supported by the gurobi backend")
+
+        t0 = time.time()
+        if self._objectives_n:
+            # Hierarchical objectives, highest priority first, each level being
+            # fixed to its optimal value before solving the next one
+            levels = sorted(self._objectives_n.items(), key=lambda o: -o[1][0])
+            objectives = [weight * expr for (_, (_, weight, expr)) in levels]
+        else:
+            objectives = [self._objective]
+
+        fixed = []
+        x = None
+        for objective in objectives:
+            status, level_x = self._solve(objective, fixed, time.time() - t0)
+            # scipy can not warm start a level, so the point of the previous levels is
+            # kept unless this level found one at least as good on its objective
+            if level_x is not None and (
+                x is None
+                or self.ModelSense * (objective.getValue(level_x) - objective.getValue(x))
+                <= 0
+            ):
+                x = level_x
+            if status != GRB.OPTIMAL:
+                break
+            value = objective.getValue(x)
+            fixed.append(
+                (objective, value - 1e-6 if self.ModelSense == GRB.MAXIMIZE else value + 1e-6)
+            )
+
+        self.Status = status
+        self.Runtime = time.time() - t0
+        self._x = x
+        if x is not None:
+            primary = self._objectives_n[0][2] if 0 in self._objectives_n else objectives[0]
+            self._objVal = primary.getValue(x)
+        else:
+            self._objVal = None
+
+    def _solve(self, objective, fixed, elapsed):
+        n = len(self._vars)
+        rows, cols, data, lower, upper = [], [], [], [], []
+        row = 0
+        constrs = [(c.expr, c.sense) for c in self._constrs.values()]
+        # Fixed objectives of the previous hierarchical levels
+        constrs += [
+            (expr - value, GRB.GREATER_EQUAL if self.ModelSense == GRB.MAXIMIZE else GRB.LESS_EQUAL)
+            for (expr, value) in fixed
+        ]
+        for expr, sense in constrs:
+            rows.extend([row] * len(expr.indices))
+            cols.extend(expr.indices)
+            data.extend(expr.coefs)
+            rhs = -expr.constant
+            lower.append(rhs if sense in (GRB.GREATER_EQUAL, GRB.EQUAL) else -np.inf)
+            upper.append(rhs if sense in (GRB.LESS_EQUAL, GRB.EQUAL) else np.inf)
+            row += 1
+
+        c = np.zeros(n)
+        np.add.at(c, objective.indices, objective.coefs)
+        if self.ModelSense == GRB.MAXIMIZE:
+            c = -c
+
+        lb = np.array(self._lb, dtype=float)
+        ub = np.array(self._ub, dtype=float)
+        lb[lb <= -GRB.INFINITY] = -np.inf
+        ub[ub >= GRB.INFINITY] = np.inf
+        integrality = np.array([0 if vtype == GRB.CONTINUOUS else 1 for vtype in self._vtype])
+
+        options = {
+            "disp": bool(self.Params.LogToConsole and self.Params.OutputFlag),
+            "mip_rel_gap": self.Params.MIPGap,
+        }
+        if self.Params.TimeLimit < GRB.INFINITY:
+            options["time_limit"] = max(self.Params.TimeLimit - elapsed, 0)
+
+        constraints = []
+        if row > 0:
+            A = coo_array((data, (rows, cols)), shape=(row, n)).tocsr()
+            constraints = [LinearConstraint(A, lower, upper)]
+        res = milp(
+            c,
+            integrality=integrality,
+            bounds=Bounds(lb, ub),
+            constraints=constraints,
+            options=options,
+        )
+
+        status = {
+            0: GRB.OPTIMAL,
+            1: GRB.TIME_LIMIT,
+            2: GRB.INFEASIBLE,
+            3: GRB.UNBOUNDED,
+        }.get(res.status, GRB.NUMERIC)
+        x = res.x
+        if x is not None:
+            # Remove the integrality tolerance so that binaries compare equal to 0 or 1
+            x = np.where(integrality == 1, np.round(x), x)
+        return status, x
+
+    @property
+    def SolCount(self):
+        return 0 if self._x is None else 1
+
+    @property
+    def objVal(self):
+        if self._objVal is None:
+            raise AttributeError("Unable to retrieve attribute 'objVal'")
+        return self._objVal
+
+    ObjVal = objVal
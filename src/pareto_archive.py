@@ -0,0 +1,83 @@
+from bisect import bisect_left, bisect_right
+
+
+class ParetoArchive:
+    # Non-dominated solutions for (max objVal, min max_assigned, min max_duration).
+    # Solutions are grouped by max_assigned, and each group is sorted by max_duration.
+    # Within a group objVal then strictly increases with max_duration, so dominance
+    # checks and inserts only need a binary search per group.
+
+    def __init__(self, solutions=(), precision=6):
+        self.precision = precision  # decimals of objVal compared for deduplication
+        self._assigned = []  # sorted max_assigned values of the groups
+        self._groups = {}  # max_assigned -> (durations, objVals, solutions)
+        self._size = 0
+        self.merge(solutions)
+
+    def objectives(self, solution):
+        return (
+            round(solution["objVal"], self.precision),
+            solution["max_assigned"],
+            solution["max_duration"],
+        )
+
+    def is_covered(self, objVal, max_assigned, max_duration):
+        # True if a solution of the archive dominates or equals these objectives
+        for assigned in self._assigned[: bisect_right(self._assigned, max_assigned)]:
+            durations, objVals, _ = self._groups[assigned]
+            index = bisect_right(durations, max_duration) - 1
+            if index >= 0 and objVals[index] >= objVal:
+                return True
+        return False
+
+    def add(self, solution):
+        # Inserts a solution unless it is dominated or a duplicate, removing the
+        # solutions it dominates. Returns True if the solution was inserted
+        objVal, max_assigned, max_duration = self.objectives(solution)
+        if self.is_covered(objVal, max_assigned, max_duration):
+            return False
+
+        for assigned in self._assigned[bisect_left(self._assigned, max_assigned) :]:
+            durations, objVals, solutions = self._groups[assigned]
+            start = end = bisect_left(durations, max_duration)
+            while end < len(durations) and objVals[end] <= objVal:
+                end += 1
+            del durations[start:end], objVals[start:end], solutions[start:end]
+            self._size -= end - start
+            if len(durations) == 0:
+                del self._groups[assigned]
+                self._assigned.remove(assigned)
+
+        if max_assigned not in self._groups:
+            self._assigned.insert(bisect_left(self._assigned, max_assigned), max_assigned)
+            self._groups[max_assigned] = ([], [], [])
+        durations, objVals, solutions = self._groups[max_assigned]
+        index = bisect_left(durations, max_duration)
+        durations.insert(index, max_duration)
+        objVals.insert(index, objVal)
+        solutions.insert(index, solution)
+        self._size += 1
+        return True
+
+    def merge(self, solutions):
+        # Bulk insertion of another archive or of any iterable of solutions. Best
+        # solutions go first so that the dominated ones are rejected straight away
+        ordered = sorted(
+            solutions,
+            key=lambda solution: (
+                -solution["objVal"],
+                solution["max_assigned"],
+                solution["max_duration"],
+            ),
+        )
+        return sum(self.add(solution) for solution in ordered)
+
+    def __iter__(self):
+        for assigned in self._assigned:
+            yield from self._groups[assigned][2]
+
+    def __len__(self):
+        return self._size
+
+    def __repr__(self):
+        return f"ParetoArchive({self._size} solutions)"
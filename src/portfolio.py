@@ -0,0 +1,274 @@
+import os
+import json
+import time
+import multiprocessing as mp
+from collections import Counter
+from queue import Empty
+
+from gurobipy import GRB
+
+from src.utils import get_size_class
+from src.build_model import build_model, evaluate_objective, find_violated_linking
+from src.compute_surface import build_variables_dictionnary
+
+# Every configuration holds build_model options and gurobi parameters
+DEFAULT_CONFIGURATIONS = [
+    {"name": "weighted", "with_epsilon_constraint": True, "params": {}},
+    {
+        "name": "weighted_feasibility",
+        "with_epsilon_constraint": True,
+        "params": {"MIPFocus": 1},
+    },
+    {
+        "name": "weighted_bound",
+        "with_epsilon_constraint": True,
+        "params": {"MIPFocus": 3, "Presolve": 2},
+    },
+    {
+        "name": "weighted_cuts",
+        "with_epsilon_constraint": True,
+        "with_valid_inequalities": True,
+        "params": {"MIPFocus": 2},
+    },
+    {"name": "hierarchical", "with_epsilon_constraint": False, "params": {}},
+]
+
+PORTFOLIO_LOG_FILE = os.path.join("results", "portfolio_log.jsonl")
+
+
+def portfolio_callback(model, where):
+    if where == GRB.Callback.MIPSOL:
+        # A candidate violating linking rows left out of the model is rejected by
+        # them, so it must not be shared
+        if model._lazy_linking is not None:
+            violated = find_violated_linking(model, model.cbGetSolution)
+            for constr in violated:
+                model.cbLazy(constr)
+            model._lazy_rows_added += len(violated)
+            if len(violated) > 0:
+                return
+
+        # Share the new incumbent, scored with the weighted-sum objective so that
+        # every configuration can be compared. Its score lets the others prove
+        # optimality, and the solution itself is injected into their search
+        solution = model.cbGetSolution(model._vars)
+        score = evaluate_objective(model._data, dict(zip(model._var_names, solution)))
+        model._known_score = max(model._known_score, score)
+        with model._best_score.get_lock():
+            if score > model._best_score.value:
+                model._best_score.value = score
+                model._best_solution[:] = solution
+
+    elif where == GRB.Callback.MIPNODE:
+        # Solutions can only be injected at nodes solved to optimality
+        if (
+            model.cbGet(GRB.Callback.MIPNODE_STATUS) == GRB.OPTIMAL
+            and model._best_score.value > model._known_score
+        ):
+            with model._best_score.get_lock():
+                model._known_score = model._best_score.value
+                solution = model._best_solution[:]
+            model.cbSetSolution(model._vars, solution)
+
+    elif where == GRB.Callback.MIP:
+        if model._done.is_set():
+            model.terminate()
+        elif model._weighted:
+            # The best incumbent of any configuration matching this bound proves optimality
+            bound = model.cbGet(GRB.Callback.MIP_OBJBND)
+            best_score = model._best_score.value
+            if best_score > float("-inf") and bound - best_score <= model._gap * max(
+                abs(best_score), 1e-10
+            ):
+                with model._winner.get_lock():
+                    if model._winner.value == -1:
+                        model._winner.value = model._index
+                model._done.set()
+                model.terminate()
+
+
+def count_variables(data):
+    # Every configuration has the variables of build_model, in the same order
+    worker_length = len(data["staff"])
+    job_length = len(data["jobs"])
+    skill_length = len(data["qualifications"])
+    day_length = data["horizon"]
+    return (
+        worker_length * job_length * skill_length * day_length  # work
+        + job_length  # is_realized
+        + 2 * job_length * day_length  # started_after, finished_before
+        + 1  # max_duration
+        + worker_length * job_length  # is_assigned
+        + 1  # max_assigned
+    )
+
+
+def run_configuration(
+    data,
+    configuration,
+    index,
+    threads,
+    time_limit,
+    best_score,
+    best_solution,
+    winner,
+    done,
+    results,
+):
+    options = {
+        key: value
+        for key, value in configuration.items()
+        if key not in ["name", "params"]
+    }
+    model = build_model(
+        data, backend="gurobi", tuned_parameters_file=None, **options
+    )
+    model.Params.LogToConsole = 0
+    model.Params.Threads = threads
+    model.Params.TimeLimit = time_limit
+    for param, value in configuration.get("params", {}).items():
+        model.setParam(param, value)
+    model.update()
+
+    model._data = data
+    model._vars = model.getVars()
+    model._var_names = [var.VarName for var in model._vars]
+    model._weighted = configuration.get("with_epsilon_constraint", False)
+    model._gap = model.Params.MIPGap
+    model._index = index
+    model._best_score = best_score
+    model._best_solution = best_solution
+    model._known_score = float("-inf")
+    model._winner = winner
+    model._done = done
+    model.optimize(portfolio_callback)
+
+    # A hierarchical model optimizes another objective, its optimum proves nothing
+    # about the weighted-sum one: it simply runs until it ends or a weighted
+    # configuration wins
+    if model.Status == GRB.OPTIMAL and model._weighted:
+        with winner.get_lock():
+            if winner.value == -1:
+                winner.value = index
+        done.set()
+
+    solution = build_variables_dictionnary(model) if model.SolCount > 0 else None
+    results.put(
+        {
+            "index": index,
+            "name": configuration["name"],
+            "status": model.Status,
+            "runtime": model.Runtime,
+            "score": evaluate_objective(data, solution) if solution else None,
+            "solution": solution,
+        }
+    )
+
+
+def run_portfolio(
+    data,
+    configurations=DEFAULT_CONFIGURATIONS,
+    time_limit=600,
+    nb_cores=None,
+    instance_name=None,
+    log_file=PORTFOLIO_LOG_FILE,
+):
+    # Solves an instance with every configuration at once, each in its own process
+    # with a share of the cores, and stops them all as soon as a weighted-sum
+    # configuration proves optimality. Returns the best solution found and the name
+    # of the winning configuration
+    if nb_cores is None:
+        nb_cores = os.cpu_count()
+    threads = max(1, nb_cores // len(configurations))
+
+    context = mp.get_context("spawn")
+    best_score = context.Value("d", float("-inf"))
+    # Guarded by the lock of best_score
+    best_solution = context.Array("d", count_variables(data), lock=False)
+    winner = context.Value("i", -1)
+    done = context.Event()
+    results = context.Queue()
+
+    t0 = time.time()
+    processes = [
+        context.Process(
+            target=run_configuration,
+            args=(
+                data,
+                configuration,
+                index,
+                threads,
+                time_limit,
+                best_score,
+                best_solution,
+                winner,
+                done,
+                results,
+            ),
+        )
+        for index, configuration in enumerate(configurations)
+    ]
+    for process in processes:
+        process.start()
+
+    runs = []
+    while len(runs) < len(processes):
+        try:
+            runs.append(results.get(timeout=1))
+        except Empty:
+            # A process dying without a result (e.g. license error) must not block us
+            if not any(process.is_alive() for process in processes):
+                break
+    for process in processes:
+        process.join()
+    wall_time = time.time() - t0
+
+    solved_runs = [run for run in runs if run["solution"] is not None]
+    best_run = max(solved_runs, key=lambda run: run["score"], default=None)
+    winner_name = (
+        configurations[winner.value]["name"] if winner.value != -1 else None
+    )
+
+    print(f"Winning configuration: {winner_name}, wall time: {wall_time:.2f}s")
+    if log_file is not None:
+        log_portfolio_run(
+            log_file, data, instance_name, winner_name, wall_time, best_run, runs
+        )
+
+    return (best_run["solution"] if best_run else None), winner_name
+
+
+def log_portfolio_run(
+    log_file, data, instance_name, winner_name, wall_time, best_run, runs
+):
+    entry = {
+        "instance": instance_name,
+        "size_class": get_size_class(data),
+        "nb_workers": len(data["staff"]),
+        "nb_jobs": len(data["jobs"]),
+        "nb_skills": len(data["qualifications"]),
+        "horizon": data["horizon"],
+        "winner": winner_name,
+        "wall_time": wall_time,
+        "best_score": best_run["score"] if best_run else None,
+        "runs": [
+            {key: run[key] for key in ["name", "status", "runtime", "score"]}
+            for run in runs
+        ],
+    }
+    os.makedirs(os.path.dirname(log_file) or ".", exist_ok=True)
+    with open(log_file, "a") as file:
+        file.write(json.dumps(entry) + "\n")
+
+
+def best_configuration_per_size_class(log_file=PORTFOLIO_LOG_FILE):
+    # Most frequent winner of the logged runs for each size class
+    wins = {}
+    with open(log_file, "r") as file:
+        for line in file:
+            entry = json.loads(line)
+            if entry["winner"] is not None:
+                wins.setdefault(entry["size_class"], Counter())[entry["winner"]] += 1
+    return {
+        size_class: counter.most_common(1)[0][0] for size_class, counter in wins.items()
+    }
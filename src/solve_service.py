@@ -0,0 +1,470 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import hashlib
+import argparse
+import contextlib
+import multiprocessing as mp
+from queue import Empty
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from src.build_model import build_model, optimize
+from src.compute_surface import (
+    compute_non_dominated_surface,
+    build_variables_dictionnary,
+)
+from src.build_preference_model import preferences, convert_examples
+
+# Local HTTP service solving instances submitted as JSON:
+#   POST /jobs             {"type": "solve" | "surface" | "preferences", "instance": {...}, ...}
+#   GET  /jobs/<id>        status, progress events and result once done
+#   GET  /jobs/<id>/events progress events streamed as JSON lines until the job ends
+#   GET  /metrics          queue depth, job counts and latencies
+
+JOB_TYPES = ["solve", "surface", "preferences"]
+CACHE_FOLDER = os.path.join("results", "service_cache")
+
+
+def sparse_solution(solution):
+    # Only the non-zero variables are kept, the others are implicitly 0
+    return {name: value for name, value in solution.items() if value != 0}
+
+
+def run_job(job_id, request, progress_queue):
+    # Executed in a worker process, the solver logs are kept off the service output
+    def report(event):
+        progress_queue.put((job_id, event))
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        instance = request["instance"]
+        options = request.get("options", {})
+        backend = request.get("backend")
+
+        if request["type"] == "solve":
+            model = build_model(instance, backend=backend, **options)
+            model.Params.LogToConsole = 0
+            if "time_limit" in request:
+                model.Params.TimeLimit = request["time_limit"]
+            report({"message": "model built"})
+            optimize(model)
+            if model.SolCount == 0:
+                return {"status": model.Status, "solution": None}
+            return {
+                "status": model.Status,
+                "solution": sparse_solution(build_variables_dictionnary(model)),
+            }
+
+        if request["type"] == "surface":
+            model = build_model(
+                instance, with_epsilon_constraint=True, backend=backend, **options
+            )
+            surface = compute_non_dominated_surface(
+                model, instance, progress_callback=report
+            )
+            return {"solutions": [sparse_solution(solution) for solution in surface]}
+
+        if request["type"] == "preferences":
+            unacceptable, correct, satisfactory = convert_examples(
+                pd.DataFrame(request["examples"]), instance
+            )
+            ranking = preferences(
+                instance,
+                request["solutions"],
+                unacceptable,
+                correct,
+                satisfactory,
+                backend=backend,
+            )
+            return {"ranking": ranking.to_dict("records")}
+
+
+def get_progress(progress_queue):
+    # Short timeout so that the reading thread never outlives the service
+    try:
+        return progress_queue.get(timeout=1)
+    except (Empty, EOFError, OSError):
+        return None
+
+
+class Job:
+    def __init__(self, job_id, request):
+        self.id = job_id
+        self.type = request["type"]
+        self.request = request
+        self.status = "queued"
+        self.events = []
+        self.result = None
+        self.error = None
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        self.updated = asyncio.Event()
+
+    def add_event(self, event):
+        self.events.append({"time": time.time(), **event})
+        # Wake up the streaming clients, then arm the event for the next update
+        self.updated.set()
+        self.updated = asyncio.Event()
+
+    def summary(self, with_result=True):
+        summary = {
+            "id": self.id,
+            "type": self.type,
+            "status": self.status,
+            "events": self.events,
+            "error": self.error,
+        }
+        if with_result:
+            summary["result"] = self.result
+        return summary
+
+
+class SolveService:
+    def __init__(
+        self,
+        max_workers=None,
+        max_queue_size=100,
+        cache_folder=CACHE_FOLDER,
+        retention_time=3600,
+        max_finished_jobs=1000,
+    ):
+        self.max_workers = max_workers or os.cpu_count()
+        self.max_queue_size = max_queue_size
+        self.cache_folder = cache_folder
+        # Finished jobs are dropped from memory after retention_time seconds or
+        # beyond max_finished_jobs, their results are then read from the cache
+        self.retention_time = retention_time
+        self.max_finished_jobs = max_finished_jobs
+        self.jobs = {}
+        self.finished_jobs = deque()
+        self.counters = {
+            "submitted": 0,
+            "deduplicated": 0,
+            "cache_hits": 0,
+            "rejected": 0,
+            "completed": 0,
+            "failed": 0,
+        }
+        self.wait_times = deque(maxlen=1000)
+        self.run_times = deque(maxlen=1000)
+
+    async def start(self):
+        context = mp.get_context("spawn")
+        self.executor = ProcessPoolExecutor(self.max_workers, mp_context=context)
+        self.manager = context.Manager()
+        self.progress_queue = self.manager.Queue()
+        self.queue = asyncio.Queue(self.max_queue_size)
+        self.tasks = [
+            asyncio.create_task(self.dispatch()) for _ in range(self.max_workers)
+        ]
+        self.tasks.append(asyncio.create_task(self.read_progress()))
+        if self.cache_folder is not None:
+            os.makedirs(self.cache_folder, exist_ok=True)
+
+    async def stop(self):
+        for task in self.tasks:
+            task.cancel()
+        self.executor.shutdown(cancel_futures=True)
+        self.manager.shutdown()
+
+    ## JOBS ##
+
+    def submit(self, request):
+        # Returns the job of the request, identical requests sharing the same job
+        if request.get("type") not in JOB_TYPES:
+            raise ValueError(f"Unknown job type, available types are {JOB_TYPES}")
+        if "instance" not in request:
+            raise ValueError("Missing instance")
+        if not isinstance(request.get("options", {}), dict):
+            raise ValueError("Options must be an object")
+        if request["type"] == "surface" and "with_epsilon_constraint" in request.get(
+            "options", {}
+        ):
+            raise ValueError("Surfaces are always computed with the epsilon constraint")
+        if request["type"] == "preferences":
+            for key in ["examples", "solutions"]:
+                if key not in request:
+                    raise ValueError(f"Missing {key}")
+        job_id = hashlib.sha256(
+            json.dumps(request, sort_keys=True).encode()
+        ).hexdigest()[:16]
+
+        job = self.jobs.get(job_id)
+        if job is not None and job.status != "failed":
+            self.counters["deduplicated"] += 1
+            return job
+
+        self.evict_jobs()
+        job = Job(job_id, request)
+        cached = self.load_cached_result(job_id)
+        if cached is not None:
+            self.counters["cache_hits"] += 1
+            job.status = "done"
+            job.result = cached["result"]
+            job.finished = time.time()
+            job.add_event({"status": "done", "cached": True})
+            self.finished_jobs.append(job)
+        else:
+            try:
+                self.queue.put_nowait(job)
+            except asyncio.QueueFull:
+                self.counters["rejected"] += 1
+                raise
+            job.add_event({"status": "queued"})
+        self.jobs[job_id] = job
+        self.counters["submitted"] += 1
+        return job
+
+    def get_job(self, job_id):
+        # Jobs evicted from memory are rebuilt from the cache, or None if unknown
+        job = self.jobs.get(job_id)
+        if job is not None:
+            return job
+        cached = self.load_cached_result(job_id)
+        if cached is None:
+            return None
+        job = Job(job_id, {"type": cached["type"]})
+        job.status = "done"
+        job.result = cached["result"]
+        job.add_event({"status": "done", "cached": True})
+        return job
+
+    def evict_jobs(self):
+        now = time.time()
+        while len(self.finished_jobs) > 0 and (
+            len(self.finished_jobs) > self.max_finished_jobs
+            or now - self.finished_jobs[0].finished > self.retention_time
+        ):
+            job = self.finished_jobs.popleft()
+            # A failed job may have been replaced by a new submission of the request
+            if self.jobs.get(job.id) is job:
+                del self.jobs[job.id]
+
+    async def dispatch(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await self.queue.get()
+            job.status = "running"
+            job.started = time.time()
+            self.wait_times.append(job.started - job.submitted)
+            job.add_event({"status": "running"})
+            try:
+                job.result = await loop.run_in_executor(
+                    self.executor, run_job, job.id, job.request, self.progress_queue
+                )
+                job.status = "done"
+                self.counters["completed"] += 1
+                self.save_cached_result(job)
+            except Exception as error:
+                job.status = "failed"
+                job.error = f"{type(error).__name__}: {error}"
+                self.counters["failed"] += 1
+            job.finished = time.time()
+            self.run_times.append(job.finished - job.started)
+            job.add_event({"status": job.status})
+            self.finished_jobs.append(job)
+            self.evict_jobs()
+            self.queue.task_done()
+
+    async def read_progress(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            progress = await loop.run_in_executor(None, get_progress, self.progress_queue)
+            if progress is None or progress[0] not in self.jobs:
+                continue
+            # Late events of a job that has already ended are dropped
+            job = self.jobs[progress[0]]
+            if job.status == "running":
+                job.add_event(progress[1])
+
+    ## CACHE ##
+
+    def load_cached_result(self, job_id):
+        if self.cache_folder is None:
+            return None
+        filepath = os.path.join(self.cache_folder, f"{job_id}.json")
+        if not os.path.exists(filepath):
+            return None
+        # Unreadable files and files of an older format are cache misses
+        try:
+            with open(filepath, "r") as file:
+                cached = json.load(file)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(cached, dict) or not {"type", "result"} <= cached.keys():
+            return None
+        return cached
+
+    def save_cached_result(self, job):
+        if self.cache_folder is None:
+            return
+        with open(os.path.join(self.cache_folder, f"{job.id}.json"), "w") as file:
+            json.dump({"type": job.type, "result": job.result}, file, default=to_json)
+
+    ## METRICS ##
+
+    def metrics(self):
+        def latency(values):
+            if len(values) == 0:
+                return None
+            return {
+                "mean": float(np.mean(values)),
+                "p50": float(np.percentile(values, 50)),
+                "p95": float(np.percentile(values, 95)),
+                "max": float(np.max(values)),
+            }
+
+        return {
+            "queue_depth": self.queue.qsize(),
+            "running": sum(job.status == "running" for job in self.jobs.values()),
+            "workers": self.max_workers,
+            **self.counters,
+            "wait_time": latency(self.wait_times),
+            "run_time": latency(self.run_times),
+        }
+
+
+def to_json(value):
+    # numpy scalars coming out of the models and dataframes
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+## HTTP ##
+
+STATUS_REASONS = {
+    200: "OK",
+    202: "Accepted",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+}
+
+
+async def send_json(writer, status, body):
+    payload = json.dumps(body, default=to_json).encode()
+    writer.write(
+        f"HTTP/1.1 {status} {STATUS_REASONS[status]}\r\n"
+        f"Content-Type: application/json\r\n"
+        f"Content-Length: {len(payload)}\r\n"
+        f"Connection: close\r\n\r\n".encode()
+        + payload
+    )
+    await writer.drain()
+
+
+async def stream_events(writer, job):
+    # Chunked response with one JSON line per progress event, until the job ends
+    writer.write(
+        b"HTTP/1.1 200 OK\r\n"
+        b"Content-Type: application/x-ndjson\r\n"
+        b"Transfer-Encoding: chunked\r\n"
+        b"Connection: close\r\n\r\n"
+    )
+    sent = 0
+    while True:
+        updated = job.updated
+        for event in job.events[sent:]:
+            line = (json.dumps(event, default=to_json) + "\n").encode()
+            writer.write(f"{len(line):x}\r\n".encode() + line + b"\r\n")
+        sent = len(job.events)
+        await writer.drain()
+        if job.status in ["done", "failed"]:
+            break
+        await updated.wait()
+    writer.write(b"0\r\n\r\n")
+    await writer.drain()
+
+
+async def handle_connection(service, reader, writer):
+    try:
+        request_line = (await reader.readline()).decode().split()
+        if len(request_line) < 2:
+            return
+        method, path = request_line[0], request_line[1].split("?")[0].rstrip("/")
+        headers = {}
+        while True:
+            line = (await reader.readline()).decode().strip()
+            if not line:
+                break
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+        try:
+            content_length = int(headers.get("content-length", 0))
+        except ValueError:
+            return await send_json(writer, 400, {"error": "Invalid Content-Length"})
+        if content_length < 0:
+            return await send_json(writer, 400, {"error": "Invalid Content-Length"})
+        body = await reader.readexactly(content_length)
+
+        parts = path.strip("/").split("/")
+        if path == "/jobs":
+            if method != "POST":
+                return await send_json(writer, 405, {"error": "Use POST to submit"})
+            try:
+                job = service.submit(json.loads(body))
+            except (ValueError, AttributeError) as error:
+                return await send_json(writer, 400, {"error": str(error)})
+            except asyncio.QueueFull:
+                return await send_json(writer, 503, {"error": "Queue is full"})
+            return await send_json(writer, 202, job.summary(with_result=False))
+
+        if path == "/metrics":
+            return await send_json(writer, 200, service.metrics())
+
+        if parts[0] == "jobs" and len(parts) in [2, 3]:
+            job = service.get_job(parts[1])
+            if job is None:
+                return await send_json(writer, 404, {"error": "Unknown job"})
+            if len(parts) == 2:
+                return await send_json(writer, 200, job.summary())
+            if parts[2] == "events":
+                return await stream_events(writer, job)
+
+        await send_json(writer, 404, {"error": "Not found"})
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    except Exception as error:
+        # Answer rather than drop the connection, the client may already be gone
+        with contextlib.suppress(Exception):
+            await send_json(
+                writer, 500, {"error": f"{type(error).__name__}: {error}"}
+            )
+    finally:
+        writer.close()
+
+
+async def serve(host="127.0.0.1", port=8080, max_workers=None, max_queue_size=100):
+    service = SolveService(max_workers, max_queue_size)
+    await service.start()
+    server = await asyncio.start_server(
+        lambda reader, writer: handle_connection(service, reader, writer), host, port
+    )
+    print(f"Serving on http://{host}:{port} with {service.max_workers} workers")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local solve service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--queue-size", type=int, default=100)
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers, args.queue_size))
+    except KeyboardInterrupt:
+        sys.exit(0)
@@ -0,0 +1,38 @@
+from types import SimpleNamespace
+
+BACKENDS = ["gurobi", "highs"]
+
+
+def get_backend(name=None):
+    # Defaults to gurobi when it is installed, and falls back on HiGHS otherwise
+    if name is None:
+        try:
+            return get_backend("gurobi")
+        except ImportError:
+            return get_backend("highs")
+
+    if name == "gurobi":
+        import gurobipy as grb
+
+        return SimpleNamespace(
+            name="gurobi", Model=grb.Model, quicksum=grb.quicksum, GRB=grb.GRB
+        )
+    if name == "highs":
+        from src import highs_backend
+
+        return SimpleNamespace(
+            name="highs",
+            Model=highs_backend.Model,
+            quicksum=highs_backend.quicksum,
+            GRB=highs_backend.GRB,
+        )
+    raise ValueError(f"Unknown backend {name}, available backends are {BACKENDS}")
+
+
+def new_model(backend=None):
+    # The backend is attached to the model so that the functions completing it
+    # use the matching quicksum and constants
+    solver = get_backend(backend)
+    model = solver.Model()
+    model._backend = solver
+    return model
@@ -0,0 +1,48 @@
+import os
+import json
+
+from src.utils import get_size_class
+
+TUNED_PARAMETERS_FILE = os.path.join("results", "tuned_parameters.json")
+
+# Only gurobi parameters are tuned, on either objective of build_model
+TUNED_BACKEND = "gurobi"
+
+
+def get_objective_name(with_epsilon_constraint):
+    return "weighted" if with_epsilon_constraint else "hierarchical"
+
+
+def load_tuned_configuration(
+    data, with_epsilon_constraint, backend, filename=TUNED_PARAMETERS_FILE
+):
+    # Best configuration found by tune_parameters for the size class of the instance
+    # and the objective of the model, or None if no tuning has been saved for them
+    if filename is None or backend != TUNED_BACKEND or not os.path.exists(filename):
+        return None
+    with open(filename, "r") as file:
+        configurations = json.load(file)
+    return configurations.get(get_size_class(data), {}).get(
+        get_objective_name(with_epsilon_constraint)
+    )
+
+
+def save_tuned_configurations(configurations, filename=TUNED_PARAMETERS_FILE):
+    # configurations maps size classes to objective names to configurations. Those
+    # of the size classes and objectives already in the file are kept unless retuned
+    saved_configurations = {}
+    if os.path.exists(filename):
+        with open(filename, "r") as file:
+            saved_configurations = json.load(file)
+    for size_class, objective_configurations in configurations.items():
+        saved_configurations.setdefault(size_class, {}).update(
+            objective_configurations
+        )
+    os.makedirs(os.path.dirname(filename) or ".", exist_ok=True)
+    with open(filename, "w") as file:
+        json.dump(saved_configurations, file, indent=4)
+
+
+def apply_solver_parameters(model, params):
+    for param, value in params.items():
+        setattr(model.Params, param, value)
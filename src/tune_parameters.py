@@ -0,0 +1,178 @@
+import time
+import random
+
+import numpy as np
+
+from src.utils import get_size_class
+from src.solver_backend import get_backend
+from src.build_model import build_model, optimize
+from src.create_random_instances import create_random_instance
+from src.solver_config import (
+    TUNED_PARAMETERS_FILE,
+    TUNED_BACKEND,
+    get_objective_name,
+    apply_solver_parameters,
+    save_tuned_configurations,
+)
+
+# Arguments of create_random_instance generating instances of each size class
+SIZE_CLASS_GENERATORS = {
+    "small": {"horizon": (5, 8), "nb_skills": 3, "nb_workers": 3, "nb_jobs": 4},
+    "medium": {"horizon": (10, 20), "nb_skills": 5, "nb_workers": 5, "nb_jobs": 10},
+    "large": {"horizon": (25, 36), "nb_skills": 10, "nb_workers": 6, "nb_jobs": 20},
+}
+
+# Only options leaving the optimum unchanged are tuned, the objective is not
+MODEL_OPTIONS_SPACE = {
+    "with_valid_inequalities": [False, True],
+}
+
+PARAMETER_SPACE = {
+    "MIPFocus": [0, 1, 2, 3],
+    "Presolve": [-1, 0, 1, 2],
+    "Cuts": [-1, 0, 1, 2, 3],
+    "Heuristics": [0.0, 0.05, 0.2],
+    "Symmetry": [-1, 0, 2],
+}
+
+
+def generate_training_set(size_class, nb_instances=5, seed=0):
+    generator = SIZE_CLASS_GENERATORS[size_class]
+    random.seed(seed)
+    np.random.seed(seed)
+    instances = []
+    while len(instances) < nb_instances:
+        # Some draws of the generator are impossible (e.g. a job of no working day),
+        # they are simply drawn again
+        try:
+            instance = create_random_instance(
+                horizon=random.randint(*generator["horizon"]),
+                nb_skills=generator["nb_skills"],
+                nb_workers=generator["nb_workers"],
+                nb_jobs=generator["nb_jobs"],
+            )
+        except ValueError:
+            continue
+        if get_size_class(instance) == size_class:
+            instances.append(instance)
+    return instances
+
+
+def sample_configuration(rng):
+    configuration = {
+        option: rng.choice(values) for option, values in MODEL_OPTIONS_SPACE.items()
+    }
+    configuration["params"] = {
+        param: rng.choice(values) for param, values in PARAMETER_SPACE.items()
+    }
+    return configuration
+
+
+def evaluate_configuration(
+    configuration,
+    instances,
+    seeds,
+    time_limit,
+    cutoff=float("inf"),
+    deadline=float("inf"),
+    with_epsilon_constraint=True,
+):
+    # Mean runtime over every (instance, seed) pair, unsolved runs counting twice the
+    # time limit. Stops early once the total exceeds cutoff, as the configuration can
+    # no longer beat the incumbent, or once the deadline is reached, as a partial
+    # evaluation can not be compared
+    total_runtime = 0
+    nb_runs = len(instances) * len(seeds)
+    for instance in instances:
+        for seed in seeds:
+            remaining_time = deadline - time.time()
+            if remaining_time <= 0:
+                return float("inf")
+            model = build_model(
+                instance,
+                with_epsilon_constraint=with_epsilon_constraint,
+                with_valid_inequalities=configuration["with_valid_inequalities"],
+                backend=TUNED_BACKEND,
+                tuned_parameters_file=None,
+            )
+            model.Params.LogToConsole = 0
+            apply_solver_parameters(model, configuration["params"])
+            model.Params.Seed = seed
+            model.Params.TimeLimit = min(time_limit, remaining_time)
+            optimize(model)
+
+            if model.Status == model._backend.GRB.OPTIMAL:
+                total_runtime += model.Runtime
+            elif time.time() >= deadline:
+                return float("inf")
+            else:
+                total_runtime += 2 * time_limit
+            if total_runtime > cutoff * nb_runs:
+                return float("inf")
+    return total_runtime / nb_runs
+
+
+def tune_parameters(
+    size_classes=("small", "medium", "large"),
+    time_budget=3600,
+    nb_instances=5,
+    seeds=(0, 1, 2),
+    time_limit=60,
+    random_seed=0,
+    with_epsilon_constraint=True,
+    filename=TUNED_PARAMETERS_FILE,
+):
+    # Random search over the model options and gurobi parameters for the model of the
+    # given objective, sharing the time budget between the size classes. The best
+    # configuration of each size class is saved to filename, where build_model and
+    # compute_non_dominated_surface find it for gurobi models of that objective
+    get_backend(TUNED_BACKEND)  # fails early without gurobipy
+    rng = random.Random(random_seed)
+    best_configurations = {}
+    for size_class in size_classes:
+        deadline = time.time() + time_budget / len(size_classes)
+        instances = generate_training_set(size_class, nb_instances, random_seed)
+
+        # The solver defaults are the first candidate
+        best_configuration = {"with_valid_inequalities": False, "params": {}}
+        best_score = evaluate_configuration(
+            best_configuration,
+            instances,
+            seeds,
+            time_limit,
+            deadline=deadline,
+            with_epsilon_constraint=with_epsilon_constraint,
+        )
+        nb_evaluated = 1
+        while time.time() < deadline:
+            configuration = sample_configuration(rng)
+            score = evaluate_configuration(
+                configuration,
+                instances,
+                seeds,
+                time_limit,
+                cutoff=best_score,
+                deadline=deadline,
+                with_epsilon_constraint=with_epsilon_constraint,
+            )
+            nb_evaluated += 1
+            if score < best_score:
+                best_configuration, best_score = configuration, score
+                print(f"{size_class}: new best mean runtime {score:.2f}s, {configuration}")
+
+        best_configurations[size_class] = {
+            get_objective_name(with_epsilon_constraint): {
+                **best_configuration,
+                "mean_runtime": best_score,
+                "nb_instances": nb_instances,
+                "nb_seeds": len(seeds),
+                "nb_configurations_evaluated": nb_evaluated,
+            }
+        }
+
+    save_tuned_configurations(best_configurations, filename)
+    return best_configurations
+
+
+if __name__ == "__main__":
+    print(tune_parameters())
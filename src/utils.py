@@ -1,5 +1,6 @@
 import os
 import json
+from functools import lru_cache
 
 import numpy as np
 import pandas as pd
@@ -12,6 +13,21 @@ def get_instance(instance_filename):
     return data
 
 
+def get_size_class(instance):
+    # Size bucket of an instance, from its number of work variables
+    nb_work_variables = (
+        len(instance["staff"])
+        * len(instance["jobs"])
+        * len(instance["qualifications"])
+        * instance["horizon"]
+    )
+    if nb_work_variables < 1000:
+        return "small"
+    if nb_work_variables < 20000:
+        return "medium"
+    return "large"
+
+
 def disply_worker_skills(instance):
     day_length = instance["horizon"]
     qualifications_worker_skill = np.array(
@@ -49,11 +65,15 @@ def disply_worker_skills(instance):
     return res
 
 
-def highlight_cols(col, instance):
-    jobs = [job["name"] for job in instance["jobs"]]
+@lru_cache(maxsize=None)
+def get_job_colors(nb_jobs):
     # Give a hex color to each job
-    cmap = mpl.cm.get_cmap("hsv", int(len(jobs) * 1.2))
-    job_colors = [mpl.colors.rgb2hex(cmap(i)[:3]) for i in range(cmap.N)][: len(jobs)]
+    cmap = mpl.colormaps["hsv"].resampled(max(int(nb_jobs * 1.2), 1))
+    return tuple(mpl.colors.rgb2hex(cmap(i)[:3]) for i in range(cmap.N))[:nb_jobs]
+
+
+def highlight_cols(col, instance):
+    job_colors = get_job_colors(len(instance["jobs"]))
     return [f"color:black;background-color: {color}" for color in job_colors]
 
 
@@ -99,10 +119,7 @@ def find_task(worker, day, instance, model):
 
 
 def color_cells(x, df, instance):
-    jobs = [job["name"] for job in instance["jobs"]]
-    # Give a hex color to each job
-    cmap = mpl.cm.get_cmap("hsv", int(len(jobs) * 1.2))
-    job_colors = [mpl.colors.rgb2hex(cmap(i)[:3]) for i in range(cmap.N)][: len(jobs)]
+    job_colors = get_job_colors(len(instance["jobs"]))
 
     df = df.applymap(lambda val: job_colors[val[0]] if val is not None else "")
     df = df.applymap(